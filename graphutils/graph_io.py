@@ -5,22 +5,152 @@ from pathlib import Path
 import shutil
 import os
 import re
-from functools import reduce
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import warnings
 
 import networkx as nx
 import numpy as np
-from graspy.utils import import_edgelist
 
 from graphutils.utils import is_graph
 from graphutils.utils import filter_graph_files
 from graphutils.s3_utils import (
     get_matching_s3_objects,
     get_credentials,
-    s3_download_graph,
+    s3_download_graphs,
     parse_path,
 )
 
+# subject and session IDs, e.g. `sub-0025427_ses-1_dwi...`
+SUB_SES_PATTERN = re.compile(r"sub-(\w*)_ses-(\w*)_dwi")
+
+# parsed graphs for s3 datasets, saved beside the downloaded edgelists
+GRAPHS_CACHE = "_graphs_cache.npz"
+
+# below this many files, n_jobs=-1 parses edgelists serially
+PARALLEL_MIN_FILES = 1000
+
+# whether np.loadtxt is implemented in C (numpy >= 1.23)
+C_LOADTXT = tuple(int(v) for v in np.__version__.split(".")[:2]) >= (1, 23)
+
+
+def load_edgelist(filename, delimiter=" "):
+    """
+    Read an edgelist into an array of edges.
+
+    Parameters
+    ----------
+    filename : str or Path
+        location of the edgelist.
+    delimiter : str
+        delimiter in the edgelist.
+
+    Returns
+    -------
+    np.ndarray, shape (n_edges, 3)
+        Each row is a (source, target, weight) triple.
+        Edges in an unweighted (two column) edgelist have weight 1.
+
+    Raises
+    ------
+    ValueError
+        If the file isn't numeric, or its lines don't all have
+        the same number of columns, 2 or 3.
+    """
+    if C_LOADTXT:
+        edges = _loadtxt(filename, delimiter)
+    else:
+        edges = _fromstring(filename, delimiter)
+
+    if not edges.size:
+        return np.empty((0, 3))
+    n_columns = edges.shape[1]
+    if n_columns == 2:
+        # unweighted, so every edge has weight 1, as in networkx
+        return np.column_stack([edges, np.ones(len(edges))])
+    if n_columns != 3:
+        raise ValueError(f"{filename} has {n_columns} columns, not 2 or 3.")
+    return edges
+
+
+def _loadtxt(filename, delimiter):
+    """
+    Read an edgelist with `np.loadtxt`, which is implemented in C from numpy 1.23.
+
+    Returns
+    -------
+    np.ndarray, shape (n_edges, n_columns)
+    """
+    # any whitespace delimits columns, as it does for `_fromstring`
+    if delimiter.isspace():
+        delimiter = None
+    with warnings.catch_warnings():
+        # an empty file is a graph with no edges, not a problem to warn about
+        warnings.simplefilter("ignore", UserWarning)
+        try:
+            return np.loadtxt(filename, delimiter=delimiter, ndmin=2)
+        except ValueError as e:
+            raise ValueError(f"{filename} is not an edgelist: {e}") from None
+
+
+def _fromstring(filename, delimiter):
+    """
+    Read an edgelist with one `np.fromstring` call over the whole file.
+    Before numpy 1.23, `np.loadtxt` tokenized line by line in python,
+    and this was >10x faster.
+
+    Returns
+    -------
+    np.ndarray, shape (n_edges, n_columns)
+    """
+    with open(filename) as f:
+        text = f.read()
+    if "#" in text:
+        text = "\n".join(line.split("#", 1)[0] for line in text.splitlines())
+    if not delimiter.isspace():
+        text = text.replace(delimiter, " ")
+
+    # np.fromstring stops early on bad data. It only warns before numpy 2
+    # and raises a ValueError after; either way, raise one naming the file.
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", DeprecationWarning)
+        try:
+            edges = np.fromstring(text, sep=" ")
+        except (DeprecationWarning, ValueError):
+            raise ValueError(f"{filename} is not a weighted edgelist.") from None
+
+    # np.fromstring doesn't see line breaks, so check the column count separately.
+    columns = _columns(text).tolist()
+    if len(columns) > 1:
+        found = ", ".join(map(str, columns))
+        raise ValueError(f"{filename} has lines with {found} columns.")
+    return edges.reshape(-1, columns[0] if columns else 3)
+
+
+def _columns(text):
+    """
+    Distinct numbers of whitespace-separated columns in the lines of `text`.
+    Blank lines are skipped.
+
+    Parameters
+    ----------
+    text : str
+        contents of an edgelist, with any delimiter replaced by spaces.
+
+    Returns
+    -------
+    np.ndarray
+        sorted distinct column counts.
+    """
+    # vectorized over the bytes, this costs a fraction of the parse itself,
+    # where splitting each line in python would cost about as much again.
+    chars = np.frombuffer(text.encode(), dtype=np.uint8)
+    space = chars <= ord(" ")
+    starts = np.flatnonzero(~space & np.r_[True, space[:-1]])
+    lines = np.searchsorted(np.flatnonzero(chars == ord("\n")), starts)
+    counts = np.bincount(lines)
+    return np.unique(counts[counts > 0])
+
 
 class NdmgDirectory:
     """
@@ -40,6 +170,9 @@ class NdmgDirectory:
         atlas to get graph files of.
     delimiter : str
         delimiter in graph files.
+    max_workers : int
+        number of concurrent downloads when pulling graphs from s3,
+        and of concurrent copies in `to_directory`.
 
     Attributes
     ----------
@@ -51,7 +184,9 @@ class NdmgDirectory:
         Send all graph files to a directory of your choosing
     """
 
-    def __init__(self, directory, atlas="", suffix="csv", delimiter=" "):
+    def __init__(
+        self, directory, atlas="", suffix="csv", delimiter=" ", max_workers=16
+    ):
         if not isinstance(directory, (str, Path)):
             message = f"Directory must be type str or Path. Instead, it is type {type(directory)}."
             raise TypeError(message)
@@ -60,6 +195,7 @@ class NdmgDirectory:
         self.delimiter = delimiter
         self.atlas = atlas
         self.suffix = suffix
+        self.max_workers = max_workers
         self.files = self._files(directory)
         self.name = self._get_name()
         if not len(self.files):
@@ -93,64 +229,80 @@ class NdmgDirectory:
 
         else:
             self.directory = Path(self.directory)
-            for dirname, _, files in os.walk(directory):
-                file_ends = list(
-                    filter_graph_files(files, suffix=self.suffix, atlas=self.atlas)
-                )
-                graphnames = [
-                    Path(dirname) / Path(graphname) for graphname in file_ends
-                ]
-                if all(graphname.exists for graphname in graphnames):
-                    output.extend(graphnames)
+            output = [Path(path) for path in self._scan(directory)]
 
         return sorted(output)
 
+    def _scan(self, directory):
+        """
+        Recursively yield the path of every graph file beneath `directory`.
+        Like `os.walk`, symlinked directories aren't followed.
+
+        Parameters
+        ----------
+        directory : str or Path
+            local directory to search.
+
+        Yields
+        ------
+        str
+            path to a graph file.
+        """
+        # DirEntry caches file type from the directory listing,
+        # so checking for files and directories costs no extra stat.
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from self._scan(entry.path)
+                elif entry.is_file() and is_graph(
+                    entry.name, suffix=self.suffix, atlas=self.atlas
+                ):
+                    yield entry.path
+
     def _get_s3(self, path, **kwargs):
-        output = []
         # parse bucket and path from self.directory
         # TODO: this breaks if the s3 directory structure changes
         bucket, prefix = parse_path(path)
-        local_dir = Path.home() / Path(f".ndmg_s3_dir/{prefix}")
+        local_dir = Path.home() / ".ndmg_s3_dir" / prefix
         if self.atlas:
-            local_dir = local_dir / Path(self.atlas)
+            local_dir = local_dir / self.atlas
         else:
-            local_dir = local_dir / Path("no_atlas")
+            local_dir = local_dir / "no_atlas"
         self.directory = local_dir
 
-        # if our local_dir already has graph files in it, just use that
-        is_dir = local_dir.is_dir()
-        has_graphs = False
-        if is_dir:
-            has_graphs = filter_graph_files(
-                local_dir.iterdir(), return_bool=True, **kwargs
-            )
-
-        # If has_graphs just got toggled, return all the graphs.
-        if has_graphs:
-            print(f"Local path {local_dir} found. Using that.")
-            graphs = filter_graph_files(local_dir.iterdir(), **kwargs)
-            return list(graphs)
-
-        print(f"Downloading objects from s3 into {local_dir}...")
+        # graph files are matched on their path beneath `prefix`, both locally
+        # and on s3, since the atlas is often only in a directory name.
+        # downloads are flattened into `local_dir`, which is named after the atlas.
+
+        # if our local_dir already has graph files in it, just use that.
+        # one scandir pass; DirEntry.is_file() doesn't need an extra stat.
+        local_name = local_dir.name.lower()
+        if local_dir.is_dir():
+            with os.scandir(local_dir) as entries:
+                graphs = [
+                    Path(entry.path)
+                    for entry in entries
+                    if entry.is_file()
+                    and is_graph(f"{local_name}/{entry.name}", **kwargs)
+                ]
+            if graphs:
+                print(f"Local path {local_dir} found. Using that.")
+                return graphs
 
         # get generator of object names
         unfiltered_objs = get_matching_s3_objects(
             bucket, prefix=prefix, suffix=self.suffix
         )
-        objs = filter_graph_files(unfiltered_objs, **kwargs)
-
-        # download each s3 graph and append local filepath to output
-        for obj in objs:
-            name = Path(obj).name
-            local = str(local_dir / Path(name))
-            print(f"Downloading {name} ...")
-            s3_download_graph(bucket, obj, local)
-            output.append(local)
-
-        # return
-        if not output:
+        keys = (obj[len(prefix) :] for obj in unfiltered_objs)
+        objs = [prefix + key for key in filter_graph_files(keys, **kwargs)]
+        if not objs:
             raise ValueError("No graphs found in the directory given.")
-        return output
+        print(f"Downloading {len(objs)} objects from s3 into {local_dir}...")
+
+        output = [os.path.join(local_dir, os.path.basename(obj)) for obj in objs]
+        local_dir.mkdir(parents=True, exist_ok=True)
+        s3_download_graphs(bucket, objs, output, max_workers=self.max_workers)
+        return [Path(path) for path in output]
 
     def _get_name(self):
         """
@@ -181,8 +333,12 @@ class NdmgDirectory:
             dst = self.directory / "graph_outputs"
         p = Path(dst).resolve()
         p.mkdir(parents=True, exist_ok=True)
-        for filename in self.files:
-            shutil.copy(filename, p)
+
+        # copies are io-bound, so overlap them across threads.
+        # shutil.copy already uses os.sendfile where the platform supports it.
+        copy = partial(shutil.copy, dst=p)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            list(executor.map(copy, self.files))
 
 
 class NdmgGraphs(NdmgDirectory):
@@ -194,6 +350,15 @@ class NdmgGraphs(NdmgDirectory):
     ----------
     delimiter : str
         The delimiter used in edgelists    
+    dtype : floating np.dtype, default np.float32
+        dtype of `graphs`. float32 holds ndmg edge weights exactly
+        at half the memory of float64.
+    n_jobs : int, default 1
+        number of processes to parse edgelists with.
+        -1 uses every CPU, but only for datasets of at least
+        `PARALLEL_MIN_FILES` files; smaller ones are parsed serially.
+        Parallel parsing starts worker processes, so scripts using it
+        need an `if __name__ == "__main__":` guard on spawn platforms.
 
     Attributes
     ----------
@@ -201,6 +366,9 @@ class NdmgGraphs(NdmgDirectory):
         The delimiter used in edgelists    
     vertices : np.ndarray
         sorted union of all nodes across edgelists.
+    nx_graphs : list of nx.Graph
+        networkx graph for each edgelist, each containing every vertex in `vertices`.
+        Only built on first access.
     graphs : np.ndarray, shape (n, v, v), 3D
         Volumetric numpy array, n vxv adjacency matrices corresponding to each edgelist.
         graphs[0, :, :] corresponds to files[0].
@@ -213,22 +381,46 @@ class NdmgGraphs(NdmgDirectory):
 
     """
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, dtype=np.float32, n_jobs=1, **kwargs):
 
+        # pass-to-ranks writes ranks in (0, 1) into arrays of this dtype
+        if not np.issubdtype(dtype, np.floating):
+            raise ValueError(f"dtype must be a floating point type, not {dtype}.")
         super().__init__(*args, **kwargs)
-        self.nx_graphs = self._nx_graphs()
-        self.vertices = self._vertices()
-        self.sort_nx_graphs()  # get vertices, sort nx graphs
-        self.graphs = self._graphs()
-        self.subjects = self._parse()[0]
-        self.sessions = self._parse()[1]
+        self.dtype = dtype
+        self.n_jobs = n_jobs
+        if not (self.s3 and self._load_cache()):
+            edgelists = self._edgelists()
+            self.vertices = self._vertices(edgelists)
+            self.graphs = self._graphs(edgelists)
+            if self.s3:
+                self._save_cache()
+        self.subjects, self.sessions = self._parse()
+        self._nx_graphs_cache = None
 
     def __repr__(self):
         return f"NdmgGraphs : {str(self.directory)}"
 
+    @property
+    def nx_graphs(self):
+        """
+        List of networkx graph objects, with every vertex in `self.vertices`.
+        Nothing else in the object needs these, so they are parsed on first access
+        and then cached.
+
+        Returns
+        -------
+        nx_graphs : List[nx.Graph]
+            List of networkX graphs corresponding to subjects.
+        """
+        if self._nx_graphs_cache is None:
+            self._nx_graphs_cache = self._nx_graphs()
+            self.sort_nx_graphs()
+        return self._nx_graphs_cache
+
     def _nx_graphs(self):
         """
-        List of networkx graph objects. Hidden property, mainly for use to calculate vertices.
+        List of networkx graph objects.
 
         Returns
         -------
@@ -242,47 +434,177 @@ class NdmgGraphs(NdmgDirectory):
         ]
         return nx_graphs
 
-    def _vertices(self):
+    def _load_cache(self):
+        """
+        Load `vertices` and `graphs` from the cache in `self.directory`.
+
+        Returns
+        -------
+        bool
+            True if a cache built from the same, unmodified files
+            with the same delimiter and dtype was found.
+        """
+        cache = self.directory / GRAPHS_CACHE
+        if not cache.is_file():
+            return False
+        names = [os.path.basename(f) for f in self.files]
+        with np.load(cache) as data:
+            if not {"files", "stats", "delimiter"} <= set(data.files):
+                return False
+            if data["files"].tolist() != names:
+                return False
+            if data["delimiter"].item() != self.delimiter:
+                return False
+            if not np.array_equal(data["stats"], self._file_stats()):
+                return False
+            graphs = data["graphs"]
+            if graphs.dtype != self.dtype:
+                return False
+            self.vertices = data["vertices"]
+            self.graphs = graphs
+        return True
+
+    def _save_cache(self):
+        """
+        Save `vertices` and `graphs` to `self.directory`,
+        so the edgelists don't have to be parsed again next time.
+        """
+        cache = self.directory / GRAPHS_CACHE
+        tmp = cache.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                files=[os.path.basename(file) for file in self.files],
+                stats=self._file_stats(),
+                delimiter=self.delimiter,
+                vertices=self.vertices,
+                graphs=self.graphs,
+            )
+        os.replace(tmp, cache)
+
+    def _file_stats(self):
+        """
+        Size and modification time of each file in `self.files`,
+        so a cache is never reused after an edgelist is re-downloaded or edited.
+
+        Returns
+        -------
+        np.ndarray, shape (n, 2)
+            (size in bytes, mtime in nanoseconds) for each file.
+        """
+        stats = [os.stat(file) for file in self.files]
+        return np.array([(st.st_size, st.st_mtime_ns) for st in stats], dtype=np.int64)
+
+    def _edgelists(self):
+        """
+        Parse every edgelist in `self.files`, in order.
+        Each file is read exactly once; `vertices` and `graphs` are both built from the result.
+
+        Returns
+        -------
+        edgelists : List[np.ndarray]
+            (n_edges, 3) arrays of (source, target, weight) triples.
+            edgelists[0] corresponds to files[0].
+        """
+        load = partial(load_edgelist, delimiter=self.delimiter)
+        n_jobs = self.n_jobs
+
+        # a file parses in well under a millisecond, so worker processes
+        # only pay for their start-up cost on large datasets.
+        # an explicit number of processes is always honoured.
+        if n_jobs == -1:
+            n_jobs = os.cpu_count() or 1
+            if len(self.files) < PARALLEL_MIN_FILES:
+                n_jobs = 1
+
+        if n_jobs <= 1:
+            return [load(file) for file in self.files]
+
+        chunksize = max(1, len(self.files) // (4 * n_jobs))
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            return list(executor.map(load, self.files, chunksize=chunksize))
+
+    def _vertices(self, edgelists):
         """
         Calculate the unioned number of nodes across all graph files.
+
+        Parameters
+        ----------
+        edgelists : List[np.ndarray]
+            output of `self._edgelists`.
         
         Returns
         -------
         np.array
             Sorted array of unioned nodes.
         """
-        return np.sort(reduce(np.union1d, [G.nodes for G in self.nx_graphs]))
+        nodes = np.concatenate([edges[:, :2].ravel() for edges in edgelists])
+        return np.unique(nodes).astype(int)
 
-    def _graphs(self):
+    def _graphs(self, edgelists):
         """
         volumetric numpy array, shape (n, v, v),
         accounting for isolate nodes by unioning the vertices of all component edgelists,
         sorted in the same order as `self.files`.
 
+        Parameters
+        ----------
+        edgelists : List[np.ndarray]
+            output of `self._edgelists`.
+
         Returns
         -------
-        graphs : np.ndarray, shape (n, v, v), 3D
+        graphs : np.ndarray, shape (n, v, v), 3D, `self.dtype`
             Volumetric numpy array, n vxv adjacency matrices corresponding to each edgelist.
-            graphs[0, :, :] corresponds to files[0].D
+            graphs[0, :, :] corresponds to files[0].
 
         """
-        list_of_arrays = import_edgelist(self.files, delimiter=self.delimiter)
-        if not isinstance(list_of_arrays, list):
-            list_of_arrays = [list_of_arrays]
-        return np.atleast_3d(list_of_arrays)
+        if not len(self.files):
+            raise ValueError(f"No graphs found in {str(self.directory)}.")
+        n_vertices = len(self.vertices)
+        if not n_vertices:
+            raise ValueError(f"No edges found in the graphs in {str(self.directory)}.")
+
+        # map each vertex ID to its row/column once, as a dense lookup table.
+        # int32 keeps the table small enough to stay in cache for large atlases.
+        # the table spans every ID between the smallest and largest vertex,
+        # so for sparse or very large IDs binary search the vertices instead.
+        first = self.vertices[0]
+        span = self.vertices[-1] - first + 1
+        if span <= 16 * n_vertices:
+            lookup = np.full(span, -1, dtype=np.int32)
+            lookup[self.vertices - first] = np.arange(n_vertices, dtype=np.int32)
+
+            def index(nodes):
+                return lookup[nodes.astype(np.intp) - first]
+
+        else:
+
+            def index(nodes):
+                return np.searchsorted(self.vertices, nodes)
+
+        # allocate the full tensor once and write each graph into its slice.
+        graphs = np.zeros((len(self.files), n_vertices, n_vertices), dtype=self.dtype)
+        for graph, edges in zip(graphs, edgelists):
+            # write (u, v) and (v, u) for each edge in file order,
+            # so repeated edges resolve the same way networkx would.
+            idx = index(edges[:, :2])
+            graph[idx.ravel(), idx[:, ::-1].ravel()] = np.repeat(edges[:, 2], 2)
+        return graphs
 
     def _parse(self):
         """
-        Get subject IDs
+        Get subject and session IDs from the edgelist filenames.
         
         Returns
         -------
-        out : np.ndarray 
-            Array of strings. Each element is a subject ID.
+        out : tuple of np.ndarray
+            Arrays of strings. Each element is a subject ID and a session ID, respectively.
         """
-        pattern = r"(?<=sub-|ses-)(\w*)(?=_ses|_dwi)"
-        subjects = [re.findall(pattern, str(edgelist))[0] for edgelist in self.files]
-        sessions = [re.findall(pattern, str(edgelist))[1] for edgelist in self.files]
+        names = map(os.path.basename, self.files)
+        matches = [SUB_SES_PATTERN.search(name) for name in names]
+        subjects = [match.group(1) for match in matches]
+        sessions = [match.group(2) for match in matches]
         return np.array(subjects), np.array(sessions)
 
     def sort_nx_graphs(self):
@@ -14,7 +14,7 @@ from graspy.utils import pass_to_ranks
 from graspy.plot import heatmap
 
 from .graph_io import NdmgGraphs
-from .utils import replace_doc, discr_stat, nearest_square
+from .utils import replace_doc, discr_stat, nearest_square, batch_pass_to_ranks
 
 
 class NdmgStats(NdmgGraphs):
@@ -40,6 +40,7 @@ class NdmgStats(NdmgGraphs):
         super().__init__(*args, **kwargs)
         self.X = self._X()
         self.Y = self.subjects
+        self._X_ranked = None
 
     def __repr__(self):
         return f"NdmgStats : {str(self.directory)}"
@@ -62,19 +63,52 @@ class NdmgStats(NdmgGraphs):
         -------
         X : np.ndarray, shape (n, v*v), 2D
             numpy array, created by vectorizing each adjacency matrix and stacking.
+            A view of `graphs` (no copy) whenever `graphs` is C-contiguous,
+            which `self.graphs` always is.
         """
         if graphs is None:
             graphs = self.graphs
-        if graphs.ndim == 3:
-            n, v1, v2 = np.shape(graphs)
-            return np.reshape(graphs, (n, v1 * v2))
-        elif len(self.files) == 1:
-            warnings.warn("Only one graph in directory.")
-            return graphs
-        else:
+        if graphs.ndim != 3:
             raise ValueError("Dimensionality of input must be 3.")
+        return graphs.reshape(len(graphs), -1)
+
+    def _X_rows(self, PTR=False):
+        """
+        Generator.
+        Yield the rows of `self.X` one at a time, each as a (1, v*v) array.
+
+        Parameters
+        ----------
+        PTR : bool
+            if True, pass each row to ranks before yielding it.
+            Uses the cached passed-to-ranks `X` instead, if it has already been computed.
+        """
+        X = self.X
+        if PTR and self._X_ranked is not None:
+            X, PTR = self._X_ranked, False
+
+        for i in range(len(X)):
+            row = X[i : i + 1]
+            yield batch_pass_to_ranks(row) if PTR else row
+
+    def _X_ptr(self):
+        """
+        `self.X`, with each graph passed-to-ranks.
+        Computed on first call and cached on the object,
+        since `self.graphs` does not change after construction.
 
-    def save_X_and_Y(self, output_directory="cwd", output_name=""):
+        Returns
+        -------
+        X : np.ndarray, shape (n, v*v), 2D
+            passed-to-ranks version of `self.X`.
+        """
+        if self._X_ranked is None:
+            self._X_ranked = batch_pass_to_ranks(self.X)
+        return self._X_ranked
+
+    def save_X_and_Y(
+        self, output_directory="cwd", output_name="", binary=False, PTR=False
+    ):
         """
         Save `self.X` and `self.subjects` into an output directory.
 
@@ -82,6 +116,16 @@ class NdmgStats(NdmgGraphs):
         ----------
         output_directory : str, default current working directory
             Directory in which to save the output.
+        output_name : str, optional
+            Prefix of the output files. Defaults to `self.name`.
+        binary : bool, default False
+            If True, save as `.npy` files with `np.save`,
+            which is much faster and smaller than csv for large `X`.
+            If False, save as csv.
+        PTR : bool, default False
+            If True, save `X` with each graph passed-to-ranks.
+            Rows are ranked and written one at a time,
+            so the full passed-to-ranks `X` is never held in memory.
 
         Returns
         -------
@@ -96,11 +140,28 @@ class NdmgStats(NdmgGraphs):
         p = Path(output_directory)
         p.mkdir(parents=True, exist_ok=True)
 
-        X_name = f"{str(p)}/{output_name}_X.csv"
-        Y_name = f"{str(p)}/{output_name}_Y.csv"
+        if binary:
+            X_name = str(p / f"{output_name}_X.npy")
+            Y_name = str(p / f"{output_name}_Y.npy")
+
+            X_out = np.lib.format.open_memmap(
+                X_name, mode="w+", dtype=self.X.dtype, shape=self.X.shape
+            )
+            for out, row in zip(X_out, self._X_rows(PTR)):
+                out[:] = row
+            X_out.flush()
+            np.save(Y_name, self.subjects)
+        else:
+            X_name = str(p / f"{output_name}_X.csv")
+            Y_name = str(p / f"{output_name}_Y.csv")
 
-        np.savetxt(X_name, self.X, fmt="%f", delimiter=",")
-        np.savetxt(Y_name, self.subjects, fmt="%s")
+            # enough significant digits for every value to read back exactly:
+            # 9 for float32, 17 for float64.
+            digits = 9 if self.X.dtype == np.float32 else 17
+            with open(X_name, "w") as f:
+                for row in self._X_rows(PTR):
+                    np.savetxt(f, row, fmt=f"%.{digits}g", delimiter=",")
+            np.savetxt(Y_name, self.subjects, fmt="%s")
 
         name = namedtuple("name", ["X", "Y"])
         return name(X_name, Y_name)
@@ -117,10 +178,7 @@ class NdmgStats(NdmgGraphs):
             Discriminability statistic.
         """
         if PTR:
-            graphs = np.copy(self.graphs)
-            graphs = np.array([pass_to_ranks(graph) for graph in graphs])
-            X = self._X(graphs)
-            return discr_stat(X, self.Y, **kwargs)
+            return discr_stat(self._X_ptr(), self.Y, **kwargs)
 
         return discr_stat(self.X, self.Y, **kwargs)
 
@@ -137,64 +195,6 @@ class NdmgStats(NdmgGraphs):
             If left empty, do not save.
         """
 
-        nmax = np.max(self.graphs)
-
-        if isinstance(i, int):
-            graph = pass_to_ranks(self.graphs[i])
-            sub = self.subjects[i]
-            sesh = self.sessions[i]
-
-        elif isinstance(i, np.ndarray):
-            graph = pass_to_ranks(i)
-            sub = ""
-            sesh = ""
-
-        else:
-            raise TypeError("Passed value must be integer or np.ndarray.")
-
-        viz = heatmap(
-            graph, title=f"sub-{sub}_session-{sesh}", xticklabels=True, yticklabels=True
-        )
-
-        # set color of title
-        viz.set_title(viz.get_title(), color="black")
-
-        # set color of colorbar ticks
-        viz.collections[0].colorbar.ax.yaxis.set_tick_params(color="black")
-
-        # set font size and color of heatmap ticks
-        for item in viz.get_xticklabels() + viz.get_yticklabels():
-            item.set_color("black")
-            item.set_fontsize(7)
-
-        if savedir:
-            p = Path(savedir).resolve()
-            if not p.is_dir():
-                p.mkdir()
-            plt.savefig(
-                p / f"sub-{sub}_sesh-{sesh}.png",
-                facecolor="white",
-                bbox_inches="tight",
-                dpi=300,
-            )
-
-        return viz
-
-    def visualize(self, i, savedir=""):
-        """
-        Visualize the ith graph of self.graphs, passed-to-ranks.
-        
-        Parameters
-        ----------
-        i : int
-            Graph to visualize.
-        savedir : str, optional
-            Directory to save graph into.
-            If left empty, do not save.
-        """
-
-        nmax = np.max(self.graphs)
-
         if isinstance(i, int):
             graph = pass_to_ranks(self.graphs[i])
             sub = self.subjects[i]
@@ -3,8 +3,11 @@ import os
 import re
 from configparser import ConfigParser
 from pathlib import Path
+from functools import lru_cache, partial
+from concurrent.futures import ThreadPoolExecutor
 
 import boto3
+from botocore.config import Config
 
 
 def get_credentials():
@@ -50,22 +53,36 @@ def parse_path(s3_datapath):
     -------
     tuple
         bucket and prefix.
+
+    Raises
+    ------
+    ValueError
+        If `s3_datapath` isn't an s3 url.
     """
-    bucket_path = str(s3_datapath).split("//")[1]
-    parts = bucket_path.split("/")
-    bucket = parts[0]
-    prefix = "/".join(parts[1:4])
+    s3_datapath = str(s3_datapath)
+    bucket, _, path = s3_datapath[len("s3://") :].partition("/")
+    if not s3_datapath.startswith("s3://") or not bucket:
+        raise ValueError(f"{s3_datapath} is not of the form s3://bucket/prefix/.")
+
+    # prefix is the first three levels beneath the bucket
+    prefix = "/".join(path.split("/", 3)[:3])
     return bucket, prefix
 
 
-def s3_client(service="s3"):
+@lru_cache(maxsize=None)
+def s3_client(service="s3", max_pool_connections=10):
     """
     create an s3 client.
+    Clients are cached per set of arguments, so credentials are read
+    and connections are opened once per process rather than per call.
 
     Parameters
     ----------
     service : str
         Type of service.
+    max_pool_connections : int
+        Size of the client's connection pool.
+        Should be at least the number of threads sharing the client.
     
     Returns
     -------
@@ -74,7 +91,10 @@ def s3_client(service="s3"):
     """
 
     ACCESS, SECRET = get_credentials()
-    return boto3.client(service, aws_access_key_id=ACCESS, aws_secret_access_key=SECRET)
+    config = Config(max_pool_connections=max_pool_connections)
+    return boto3.client(
+        service, aws_access_key_id=ACCESS, aws_secret_access_key=SECRET, config=config
+    )
 
 
 def get_matching_s3_objects(bucket, prefix="", suffix=""):
@@ -98,14 +118,15 @@ def get_matching_s3_objects(bucket, prefix="", suffix=""):
     if isinstance(prefix, str):
         kwargs["Prefix"] = prefix
 
-    while True:
+    # The S3 API is paginated, returning up to 1000 keys at a time.
+    # The paginator passes continuation tokens along for us.
+    # Pages can't be fetched concurrently, since each needs the previous token.
+    paginator = s3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(**kwargs):
 
-        # The S3 API response is a large blob of metadata.
         # 'Contents' contains information about the listed objects.
-        resp = s3.list_objects_v2(**kwargs)
-
         try:
-            contents = resp["Contents"]
+            contents = page["Contents"]
         except KeyError:
             print("No contents found.")
             return
@@ -115,16 +136,8 @@ def get_matching_s3_objects(bucket, prefix="", suffix=""):
             if key.startswith(prefix) and key.endswith(suffix):
                 yield key
 
-        # The S3 API is paginated, returning up to 1000 keys at a time.
-        # Pass the continuation token into the next response, until we
-        # reach the final page (when this field is missing).
-        try:
-            kwargs["ContinuationToken"] = resp["NextContinuationToken"]
-        except KeyError:
-            break
 
-
-def s3_download_graph(bucket, prefix, local):
+def s3_download_graph(bucket, prefix, local, s3=None):
     """
     Given an s3 directory, copies in that directory to local.
     
@@ -136,9 +149,38 @@ def s3_download_graph(bucket, prefix, local):
         location of s3 object.
     local : str
         s3 object download location.
+    s3 : boto3.client, optional
+        client to download with. Pass one in when downloading
+        from several threads; a new client is created by default.
     """
     parent = Path(local).parent
     if not parent.is_dir():
         parent.mkdir(parents=True, exist_ok=True)
-    s3 = s3_client()
+    if s3 is None:
+        s3 = s3_client()
     s3.download_file(bucket, prefix, local)
+
+
+def s3_download_graphs(bucket, prefixes, local_paths, max_workers=16):
+    """
+    Download many s3 objects concurrently.
+    Per-object latency dominates for small files like edgelists,
+    so the downloads are overlapped across a pool of threads.
+    
+    Parameters
+    ----------
+    bucket : str
+        s3 bucket name.
+    prefixes : list of str
+        locations of s3 objects.
+    local_paths : list of str
+        download location of each s3 object.
+    max_workers : int
+        maximum number of concurrent downloads.
+    """
+    # one client, with a connection for each thread
+    s3 = s3_client(max_pool_connections=max_workers)
+    download = partial(s3_download_graph, bucket, s3=s3)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # consume the iterator so download errors are raised here
+        list(executor.map(download, prefixes, local_paths))
@@ -4,17 +4,19 @@ import pytest
 from graphutils.graph_io import NdmgGraphs, NdmgDirectory
 from graphutils.graph_stats import NdmgStats
 
+DATAPATH = Path(__file__).resolve().parent / "data"
 
-@pytest.fixture(params=["simple_graphs", "full_directory"])
-def ND(shared_datadir, request):
+
+# the test data is only read, so each dataset is parsed once per session
+@pytest.fixture(scope="session", params=["simple_graphs", "full_directory"])
+def ND(request):
     p = Path(request.param)
-    return NdmgStats(shared_datadir / p)
+    return NdmgStats(DATAPATH / p)
 
 
-@pytest.fixture(params=["simple_graphs", "full_directory"])
-def NDD(shared_datadir, request):
-    p = Path(request.param)
-    return NdmgStats(shared_datadir / p)
+@pytest.fixture(scope="session")
+def NDD(ND):
+    return ND
 
 
 @pytest.fixture()
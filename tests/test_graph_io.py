@@ -1,12 +1,19 @@
 import os
-import shutil
+import copy
 from pathlib import Path
 import re
 
 import pytest
 import numpy as np
-import networkx as nx
-from graphutils.graph_io import NdmgGraphs, NdmgDirectory
+from graphutils.graph_io import NdmgGraphs, NdmgDirectory, load_edgelist
+
+SUBJECT = re.compile(r"sub-(\w*)_ses")
+
+
+@pytest.fixture(params=[True, False], ids=["loadtxt", "fromstring"])
+def parser(request, monkeypatch):
+    # load_edgelist picks its parser by numpy version; test both either way
+    monkeypatch.setattr("graphutils.graph_io.C_LOADTXT", request.param)
 
 
 class TestNdmgGraphs:
@@ -41,43 +48,174 @@ class TestNdmgGraphs:
 
         # check if all files have data in them
         for filename in ND.files:
-            array = np.genfromtxt(str(filename), delimiter=" ")
-            assert array.shape[1] == 3
+            with open(filename) as f:
+                line = f.readline()
+            assert len(line.split(ND.delimiter)) == 3
 
     def test_ordering(self, ND):
         # test if ordering of all properties correspond
-        for i, _ in enumerate(ND.files):
-            graphi_file = ND.files[i]
-            graphi_subject = ND.subjects[i]
-            graphi_graph = ND.graphs[i]
-
-            # subject/files correspond to same scan
-            pattern = r"(?<=sub-)(\w*)(?=_ses)"
-            assert re.findall(pattern, str(graphi_file))[0] == graphi_subject
-
-            # subject/files and graphs/X-rows correspond to the same scan
-            current_NX = nx.read_weighted_edgelist(
-                graphi_file, nodetype=int, delimiter=ND.delimiter
-            )
-            graph_from_file_i = nx.to_numpy_array(
-                current_NX, nodelist=ND.vertices, dtype=np.float
-            )
-            assert np.array_equal(graph_from_file_i, graphi_graph)
-
-    def test_to_directory(self, ND):
-        # TODO: use tmp_path_factory
-        p = "/tmp/testdir"
-        if Path(p).exists():
-            shutil.rmtree(p)
+        # subject/files correspond to same scan
+        subjects = [SUBJECT.search(file.name).group(1) for file in ND.files]
+        assert np.array_equal(subjects, ND.subjects)
+
+        # subject/files and graphs/X-rows correspond to the same scan:
+        # check every file's edges against its graph in one pass
+        edgelists = [np.loadtxt(f, delimiter=ND.delimiter, ndmin=2) for f in ND.files]
+        k = np.repeat(np.arange(len(edgelists)), [len(e) for e in edgelists])
+        edges = np.concatenate(edgelists)
+        u, v = np.searchsorted(ND.vertices, edges[:, :2]).T
+        weights = edges[:, 2]
+        assert np.array_equal(ND.graphs[k, u, v], weights)
+        assert np.array_equal(ND.graphs[k, v, u], weights)
+
+        # and every other entry is zero
+        entries = np.c_[np.r_[k, k], np.r_[u, v], np.r_[v, u]]
+        entries = entries[np.tile(weights != 0, 2)]
+        assert np.count_nonzero(ND.graphs) == len(np.unique(entries, axis=0))
+
+    def test_graphs_match_reference(self, tmp_path):
+        # a repeated edge, in either direction, keeps its last weight,
+        # as networkx does; vertices are unioned across files.
+        (tmp_path / "sub-0_ses-1_dwi_adj.csv").write_text("1 2 3\n2 3 4\n2 1 5\n")
+        (tmp_path / "sub-0_ses-2_dwi_adj.csv").write_text("3 4 1\n3 4 2\n")
+        expected = np.array(
+            [
+                [[0, 5, 0, 0], [5, 0, 4, 0], [0, 4, 0, 0], [0, 0, 0, 0]],
+                [[0, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 2], [0, 0, 2, 0]],
+            ]
+        )
+
+        graphs = NdmgGraphs(tmp_path)
+        assert np.array_equal(graphs.vertices, [1, 2, 3, 4])
+        assert np.array_equal(graphs.graphs, expected)
+
+    def test_graphs_sparse_vertex_ids(self, tmp_path):
+        # a dense lookup table over these IDs would take gigabytes
+        (tmp_path / "sub-0_ses-1_dwi_adj.csv").write_text("1 4000000000 3\n7 1 2\n")
+        expected = [[[0, 2, 3], [2, 0, 0], [3, 0, 0]]]
+
+        graphs = NdmgGraphs(tmp_path)
+        assert np.array_equal(graphs.vertices, [1, 7, 4000000000])
+        assert np.array_equal(graphs.graphs, expected)
+
+    def test_to_directory(self, ND, tmp_path):
+        p = tmp_path / "testdir"
         ND.to_directory(p)
 
         # test that original directory still exists unchanged
-        for new, old in zip(sorted(Path(p).iterdir()), ND.files):
-            assert new.name == old.name
+        assert {f.name for f in Path(p).iterdir()} == {f.name for f in ND.files}
 
     def test_nx_graphs_all_unioned(self, ND):
         unioned = [tuple(sorted(graph.nodes)) for graph in ND.nx_graphs]
         assert len(set(unioned)) == 1
 
+    @pytest.mark.parametrize("dtype", [np.float32, np.float64])
+    def test_dtype(self, ND, dtype):
+        graphs = NdmgGraphs(ND.directory, dtype=dtype).graphs
+        assert graphs.dtype == dtype
+        assert np.array_equal(graphs, ND.graphs)
+
+    @pytest.mark.parametrize("dtype", [np.int64, np.uint8, bool])
+    def test_dtype_must_be_floating(self, ND, dtype):
+        with pytest.raises(ValueError):
+            NdmgGraphs(ND.directory, dtype=dtype)
+
+    def test_parallel_parsing(self, ND):
+        # an explicit n_jobs is honoured however few files there are
+        graphs = NdmgGraphs(ND.directory, n_jobs=2).graphs
+        assert np.array_equal(graphs, ND.graphs)
+
+    def test_cache_roundtrip(self, ND, tmp_path):
+        ND = copy.copy(ND)  # ND is shared across the session; don't mutate it
+        graphs, vertices = ND.graphs, ND.vertices
+        ND.directory = tmp_path
+        ND._save_cache()
+        assert ND._load_cache()
+        assert np.array_equal(ND.graphs, graphs)
+        assert np.array_equal(ND.vertices, vertices)
+
+        # a different file list invalidates the cache
+        ND.files = ND.files[1:]
+        assert not ND._load_cache()
+
+    def test_cache_invalidated_by_changes(self, ND, tmp_path):
+        ND.to_directory(tmp_path)
+        graphs = NdmgGraphs(tmp_path)
+        graphs._save_cache()
+        assert graphs._load_cache()
+
+        # a different delimiter invalidates the cache
+        graphs.delimiter = ","
+        assert not graphs._load_cache()
+        graphs.delimiter = ND.delimiter
+
+        # and a file modified since the cache was written
+        st = os.stat(graphs.files[0])
+        os.utime(graphs.files[0], ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+        assert not graphs._load_cache()
+
+    def test_load_edgelist_matches_loadtxt(self, ND, parser):
+        for file in ND.files:
+            edges = np.loadtxt(file, delimiter=ND.delimiter, ndmin=2)
+            assert np.array_equal(load_edgelist(file, ND.delimiter), edges)
+
+    def test_load_edgelist_bad_data(self, tmp_path, parser):
+        bad = tmp_path / "bad.csv"
+        bad.write_text("1 2 3\n4 x 6\n")
+        with pytest.raises(ValueError, match="bad.csv"):
+            load_edgelist(bad)
+
+    def test_load_edgelist_unweighted(self, tmp_path, parser):
+        unweighted = tmp_path / "unweighted.csv"
+        unweighted.write_text("1 2\n3 4\n\n5 6\n")
+        expected = [[1, 2, 1], [3, 4, 1], [5, 6, 1]]
+        assert np.array_equal(load_edgelist(unweighted), expected)
+
+    def test_load_edgelist_ragged(self, tmp_path, parser):
+        ragged = tmp_path / "ragged.csv"
+        ragged.write_text("1 2 3\n4 5\n6 7 8 9\n")
+        with pytest.raises(ValueError, match="ragged.csv"):
+            load_edgelist(ragged)
+
+    def test_graphs_without_edges(self, tmp_path, parser):
+        (tmp_path / "sub-0_ses-1_dwi_adj.csv").write_text("")
+        with pytest.raises(ValueError, match="No edges"):
+            NdmgGraphs(tmp_path)
+
+    def test_graphs_without_files(self, ND):
+        ND = copy.copy(ND)
+        ND.files = []
+        with pytest.raises(ValueError, match="No graphs found"):
+            ND._graphs([])
+
+    def test_s3_atlas_in_directory_name(self, tmp_path, monkeypatch):
+        # the usual ndmg layout: the atlas is only in the directory name
+        keys = [
+            f"data/ndmg/sub-{i}/ses-1/desikan_res-2x2x2/sub-{i}_ses-1_dwi_adj.csv"
+            for i in range(3)
+        ]
+        keys.append("data/ndmg/sub-0/ses-1/aal_res-2x2x2/sub-0_ses-1_dwi_adj.csv")
+        downloads = []
+
+        def download(bucket, prefixes, local_paths, **kwargs):
+            downloads.extend(prefixes)
+            for path in local_paths:
+                Path(path).touch()
+
+        monkeypatch.setenv("HOME", str(tmp_path))
+        monkeypatch.setattr(
+            "graphutils.graph_io.get_matching_s3_objects", lambda *a, **k: keys
+        )
+        monkeypatch.setattr("graphutils.graph_io.s3_download_graphs", download)
+
+        ND = NdmgDirectory("s3://bucket/data/ndmg/", atlas="desikan")
+        assert downloads == keys[:3]
+        assert [f.name for f in ND.files] == [Path(key).name for key in keys[:3]]
+
+        # the downloaded files are found again without listing s3
+        monkeypatch.setattr("graphutils.graph_io.get_matching_s3_objects", None)
+        cached = NdmgDirectory("s3://bucket/data/ndmg/", atlas="desikan")
+        assert cached.files == ND.files
+
     # TODO : test to check atlas pulls from the right thing.
     # TODO : test to check s3 directory pulling.
@@ -1,4 +1,5 @@
 import os
+import copy
 import shutil
 from pathlib import Path
 import re
@@ -6,17 +7,18 @@ import re
 import pytest
 import numpy as np
 import networkx as nx
+from graspy.utils import pass_to_ranks
 from graphutils.graph_stats import NdmgStats
 
 
 class TestNdmgDiscrim:
-    # TODO: test X ordering
-    # graphi_X = ND.X[i].reshape(
-    #     int(np.sqrt(ND.X.shape[1])), int(np.sqrt(ND.X.shape[1]))
-    # )  # TODO
+    def test_X_is_view_of_graphs(self, NDD):
+        assert np.shares_memory(NDD.X, NDD.graphs)
 
-    # graphs/X-rows correspond to same scan
-    # assert np.array_equal(graphi_graph, graphi_X)  # TODO
+        # graphs/X-rows correspond to same scan
+        n_vertices = len(NDD.vertices)
+        for graph, row in zip(NDD.graphs, NDD.X):
+            assert np.array_equal(graph, row.reshape(n_vertices, n_vertices))
 
     def test_PTR(self, NDD):
         # TODO : make sure I can recreate X and Y from the files in `save_X_and_Y`
@@ -33,3 +35,45 @@ class TestNdmgDiscrim:
 
         assert np.array_equal(NDD.X, X)
         assert np.array_equal(NDD.subjects, Y)
+
+    def test_discriminability_caches_ptr(self, NDD):
+        stat = NDD.discriminability()
+        X_ptr = NDD._X_ptr()
+
+        assert 0 <= stat <= 1
+        assert NDD._X_ptr() is X_ptr
+        assert NDD.discriminability() == stat
+
+    def test_save_X_and_Y_binary(self, NDD, tmp_path_factory):
+        tmp = tmp_path_factory.mktemp("savedir")
+        saveloc = NDD.save_X_and_Y(tmp, binary=True)
+
+        assert np.array_equal(NDD.X, np.load(saveloc.X))
+        assert np.array_equal(NDD.subjects, np.load(saveloc.Y))
+
+    @pytest.mark.parametrize("binary", [True, False])
+    def test_save_X_and_Y_PTR(self, NDD, tmp_path_factory, binary):
+        # NDD is shared across the session, and other tests may have cached its
+        # passed-to-ranks X; drop that so rows are ranked one at a time here.
+        NDD = copy.copy(NDD)
+        NDD._X_ranked = None
+        tmp = tmp_path_factory.mktemp("savedir")
+        saveloc = NDD.save_X_and_Y(tmp, binary=binary, PTR=True)
+
+        if binary:
+            X = np.load(saveloc.X)
+        else:
+            X = np.atleast_2d(np.loadtxt(saveloc.X, delimiter=","))
+
+        expected = np.array([pass_to_ranks(graph) for graph in np.copy(NDD.graphs)])
+        assert np.allclose(expected.reshape(len(expected), -1), X)
+
+    @pytest.mark.parametrize("dtype", [np.float32, np.float64])
+    def test_save_X_and_Y_roundtrip(self, NDD, tmp_path, dtype):
+        NDD = copy.copy(NDD)  # NDD is shared across the session; don't mutate it
+        rng = np.random.RandomState(0)
+        NDD.X = (rng.rand(3, 50) * 1e8).astype(dtype)
+        saveloc = NDD.save_X_and_Y(tmp_path)
+
+        X = np.loadtxt(saveloc.X, delimiter=",", ndmin=2).astype(dtype)
+        assert np.array_equal(NDD.X, X)
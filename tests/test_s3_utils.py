@@ -0,0 +1,56 @@
+from unittest.mock import MagicMock
+
+import pytest
+from graphutils.s3_utils import parse_path, s3_download_graphs
+
+
+class TestParsePath:
+    @pytest.mark.parametrize(
+        "path, expected",
+        [
+            ("s3://ndmg-data/HNU1/ndmg_0-1-2/", ("ndmg-data", "HNU1/ndmg_0-1-2/")),
+            ("s3://ndmg-data/HNU1/ndmg_0-1-2", ("ndmg-data", "HNU1/ndmg_0-1-2")),
+            ("s3://ndmg-data/a/b/c/d/e.csv", ("ndmg-data", "a/b/c")),
+            ("s3://ndmg-data/", ("ndmg-data", "")),
+            ("s3://ndmg-data", ("ndmg-data", "")),
+        ],
+    )
+    def test_bucket_and_prefix(self, path, expected):
+        assert parse_path(path) == expected
+
+    @pytest.mark.parametrize(
+        "path", ["ndmg-data/HNU1/", "/local/ndmg/path", "s3:/ndmg-data/", "s3:///HNU1/"]
+    )
+    def test_not_s3(self, path):
+        with pytest.raises(ValueError):
+            parse_path(path)
+
+
+class TestS3DownloadGraphs:
+    @pytest.fixture
+    def client(self, monkeypatch):
+        client = MagicMock()
+        monkeypatch.setattr("graphutils.s3_utils.s3_client", lambda **kwargs: client)
+        return client
+
+    def test_downloads_each_prefix_to_its_path(self, client, tmp_path):
+        prefixes = [f"data/sub-{i}_ses-1_dwi_adj.csv" for i in range(5)]
+        local_paths = [str(tmp_path / "out" / f"{i}.csv") for i in range(5)]
+
+        s3_download_graphs("bucket", prefixes, local_paths, max_workers=3)
+
+        calls = {args for args, _ in client.download_file.call_args_list}
+        assert calls == set(zip(["bucket"] * 5, prefixes, local_paths))
+        assert (tmp_path / "out").is_dir()
+
+    def test_download_errors_propagate(self, client, tmp_path):
+        def download_file(bucket, prefix, local):
+            if prefix == "missing":
+                raise OSError(prefix)
+
+        client.download_file.side_effect = download_file
+        prefixes = ["a", "missing", "b"]
+        local_paths = [str(tmp_path / p) for p in prefixes]
+
+        with pytest.raises(OSError, match="missing"):
+            s3_download_graphs("bucket", prefixes, local_paths)
@@ -0,0 +1,57 @@
+import pytest
+import numpy as np
+from graspy.utils import pass_to_ranks
+from graphutils.utils import is_graph, batch_pass_to_ranks, _discr_rdf
+
+
+class TestIsGraph:
+    def test_atlas_does_not_persist(self):
+        filename = "sub-0025427_ses-1_dwi_desikan_adj.csv"
+        assert not is_graph(filename, atlas="aal", suffix="csv")
+        assert is_graph(filename, atlas="desikan", suffix="csv")
+        assert is_graph(filename, suffix="csv")
+
+
+class TestBatchPassToRanks:
+    def test_matches_graspy(self):
+        rng = np.random.RandomState(0)
+        graphs = rng.randint(0, 5, size=(4, 10, 10)).astype(float)
+        graphs[1] = (graphs[1] > 2).astype(float)  # unweighted graph
+        expected = np.array([pass_to_ranks(graph) for graph in np.copy(graphs)])
+
+        X = graphs.reshape(len(graphs), -1)
+        ranked = batch_pass_to_ranks(X)
+
+        assert np.allclose(ranked, expected.reshape(len(graphs), -1))
+        assert np.array_equal(X, graphs.reshape(len(graphs), -1))
+
+    def test_in_place(self):
+        rng = np.random.RandomState(1)
+        X = rng.randint(0, 5, size=(3, 25)).astype(float)
+        expected = batch_pass_to_ranks(X)
+
+        out = batch_pass_to_ranks(X, out=X)
+
+        assert out is X
+        assert np.array_equal(X, expected)
+
+
+class TestDiscrRdf:
+    @pytest.mark.parametrize("n_labels", [30, 3])  # small and large label groups
+    def test_matches_naive(self, n_labels):
+        rng = np.random.RandomState(0)
+        D = rng.randint(0, 10, size=(60, 60)).astype(float)  # with ties
+        D = D + D.T
+        labels = np.repeat(np.arange(n_labels), 60 // n_labels)
+
+        rdfs = _discr_rdf(D, labels)
+
+        for i, label in enumerate(labels):
+            idx = labels == label
+            Dij = D[i][~idx]
+            idx[i] = False
+            expected = [
+                1 - ((Dij < d).sum() + 0.5 * (Dij == d).sum()) / Dij.size
+                for d in D[i][idx]
+            ]
+            assert np.allclose(rdfs[i, : len(expected)], expected)